@@ -1,3 +1,12 @@
-zip lambda_function.zip ffmpeg_lambda.py
-aws lambda update-function-code --function-name videocloud-ffmpeg --zip-file fileb://lambda_function.zip 
-rm lambda_function.zip
+ACCOUNT=169776285963
+REGION=us-east-1
+IMAGE=$ACCOUNT.dkr.ecr.$REGION.amazonaws.com/videocloud-ffmpeg:latest
+
+aws ecr get-login-password --region $REGION | docker login --username AWS --password-stdin $ACCOUNT.dkr.ecr.$REGION.amazonaws.com
+docker buildx build --platform linux/amd64 -t $IMAGE .
+docker push $IMAGE
+# SOCI index lets lambda lazy-load the image, paging in only the bytes the
+# function actually touches instead of pulling the whole image at cold start
+soci create $IMAGE
+soci push $IMAGE
+aws lambda update-function-code --function-name videocloud-ffmpeg --image-uri $IMAGE
@@ -1,13 +1,17 @@
+import concurrent.futures
+import functools
 import os
 import logging
+import re
+import threading
 from typing import Union, Tuple
 import subprocess
 from urllib.parse import unquote
 from pathlib import Path
 import shutil
 
-import boto3
-import botocore
+# boto3/botocore are imported lazily inside get_s3/get_transfer_config so the
+# import cost is paid on first use instead of during the billed init phase
 
 RUNNING_IN_LAMBDA = os.environ.get("LAMBDA_TASK_ROOT")
 if RUNNING_IN_LAMBDA:
@@ -20,15 +24,172 @@ else:
 logger = logging.getLogger("cloudvideo_ffmpeg")
 logger.setLevel(logging.DEBUG)
 
-s3 = boto3.client("s3")
-
 S3_SOURCE_BUCKET = "videocloud-s3"
 S3_SOURCE_PATH = "uploads/"
 S3_RENDERED_PATH = "rendered/"
 
+# Stream s3 -> ffmpeg -> s3 through pipes instead of staging files in /tmp.
+# Set STREAMING_ENABLED=0 to fall back to the disk-based pipeline.
+STREAMING_ENABLED = os.environ.get("STREAMING_ENABLED", "1") != "0"
+PIPE_BUFFER_SIZE = 1 << 20
+
+# The fragment size of /tmp never changes, so read it once at init
+_FRSIZE = os.statvfs(TEMP_DIR).f_frsize
+
+# Hardware encoder to substitute for libx264, e.g. h264_nvenc on an
+# NVIDIA-backed container host or h264_v4l2m2m on Graviton. Unset means the
+# CPU encoder; vanilla lambda has no accelerator so it stays unset there.
+HW_ENCODER = os.environ.get("FFMPEG_HW_ENCODER", "")
+
+# Clients and configs are created on first use and kept at module scope so
+# warm invocations reuse them. The lock matters because the pipe threads of
+# concurrent tasks can hit a getter's first call at the same time, and
+# boto3's default-session setup is not thread-safe.
+_init_lock = threading.Lock()
+_s3 = None
+_transfer_config = None
+_crt_manager = None
+_crt_available: Union[bool, None] = None
+
+
+def get_s3():
+    global _s3
+    if _s3 is None:
+        with _init_lock:
+            if _s3 is None:
+                import boto3
+                from botocore.config import Config
+
+                # The default Config caps the pool at 10 connections; a
+                # bigger pool plus keepalive lets multipart workers on a warm
+                # container reuse their TLS connections instead of
+                # re-handshaking. The region is pinned so the client never
+                # falls back to a metadata lookup, and S3_ACCELERATE=1 opts
+                # into transfer acceleration for deployments that sit far
+                # from the bucket's region.
+                _s3 = boto3.client(
+                    "s3",
+                    region_name=os.environ.get("AWS_REGION", "us-east-1"),
+                    config=Config(
+                        max_pool_connections=50,
+                        tcp_keepalive=True,
+                        retries={"max_attempts": 3, "mode": "adaptive"},
+                        s3={
+                            "addressing_style": "virtual",
+                            "use_accelerate_endpoint": os.environ.get(
+                                "S3_ACCELERATE", "0"
+                            )
+                            == "1",
+                        },
+                    ),
+                )
+    return _s3
+
+
+def get_transfer_config():
+    global _transfer_config
+    if _transfer_config is None:
+        with _init_lock:
+            if _transfer_config is None:
+                from boto3.s3.transfer import TransferConfig
+
+                # The boto3 defaults (8 MiB parts, 10 threads) leave most of
+                # the lambda's network bandwidth idle; larger parts and more
+                # workers keep it saturated
+                _transfer_config = TransferConfig(
+                    multipart_threshold=8 * 1024 * 1024,
+                    multipart_chunksize=16 * 1024 * 1024,
+                    max_concurrency=max(8, (os.cpu_count() or 2) * 4),
+                    max_io_queue=1000,
+                    io_chunksize=1024 * 1024,
+                    use_threads=True,
+                )
+    return _transfer_config
+
+
+def get_crt_manager():
+    # The CRT transfer manager (pip install boto3[crt]) does parallel
+    # multipart transfers in C instead of GIL-bound python threads
+    global _crt_manager, _crt_available
+    if _crt_available is False:
+        return None
+    if _crt_manager is None:
+        with _init_lock:
+            if _crt_available is False:
+                return None
+            if _crt_manager is None:
+                try:
+                    from s3transfer.crt import (
+                        BotocoreCRTCredentialsWrapper,
+                        BotocoreCRTRequestSerializer,
+                        CRTTransferManager,
+                        create_s3_crt_client,
+                    )
+                except ImportError:
+                    _crt_available = False
+                    return None
+                import botocore.session
+
+                session = botocore.session.Session()
+                credentials = BotocoreCRTCredentialsWrapper(
+                    session.get_credentials()
+                )
+                crt_client = create_s3_crt_client(
+                    region=os.environ.get("AWS_REGION", "us-east-1"),
+                    crt_credentials_provider=credentials.to_crt_credentials_provider(),
+                    target_throughput=5.0 * 1024 * 1024 * 1024 / 8,
+                )
+                _crt_manager = CRTTransferManager(
+                    crt_client, BotocoreCRTRequestSerializer(session)
+                )
+                _crt_available = True
+    return _crt_manager
+
+
+@functools.lru_cache(maxsize=1)
+def get_hw_encoder() -> Union[str, None]:
+    if not HW_ENCODER:
+        return None
+    try:
+        encoders = subprocess.check_output(
+            [FFMPEG_DIR, "-hide_banner", "-encoders"],
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    if HW_ENCODER.encode() not in encoders:
+        logger.info("encoder %s not in this ffmpeg build", HW_ENCODER)
+        return None
+    return HW_ENCODER
+
+
+def apply_hw_encoder(command: list, hw_encoder: str) -> list:
+    command = list(command)
+    command[command.index("libx264")] = hw_encoder
+    if "-x264-params" in command:
+        pos = command.index("-x264-params")
+        del command[pos : pos + 2]
+    if hw_encoder == "h264_nvenc":
+        # nvenc has its own preset ladder and tune/rate-control vocabulary
+        if "-preset" in command:
+            command[command.index("-preset") + 1] = "p4"
+        if "-tune" in command:
+            command[command.index("-tune") + 1] = "ll"
+        if "-crf" in command:
+            pos = command.index("-crf")
+            command[pos : pos + 2] = ["-rc", "vbr", "-cq", command[pos + 1], "-b:v", "0"]
+    elif hw_encoder == "h264_v4l2m2m":
+        for option in ("-preset", "-tune", "-crf"):
+            if option in command:
+                pos = command.index(option)
+                del command[pos : pos + 2]
+        pos = command.index(hw_encoder)
+        command[pos + 1 : pos + 1] = ["-num_output_buffers", "32"]
+    return command
+
 
 def get_ffmpeg_command(
-    task: str, file_path: str = "", rendered_file_path: str = ""
+    task: str = "", file_path: str = "", rendered_file_path: str = "", threads: int = 0
 ) -> Tuple[Union[list, None], list]:
 
     command_header = [
@@ -40,9 +201,19 @@ def get_ffmpeg_command(
         file_path,
     ]
 
+    # Fragmented output writes a usable moov up front, so ffmpeg never
+    # re-reads the whole file to relocate the moov atom at the end and the
+    # result can be written to a non-seekable pipe; fastdecode/zerolatency
+    # suit the web-playback downstream
     command_footer = [
         "-profile:v",
         "baseline",
+        "-tune",
+        "fastdecode,zerolatency",
+        "-movflags",
+        "+faststart+frag_keyframe+empty_moov",
+        "-flush_packets",
+        "1",
         "-y",
         rendered_file_path,
     ]
@@ -50,18 +221,27 @@ def get_ffmpeg_command(
     ffmpeg_tasks = {
         "h264_mp4_light": [
             *command_header,
+            "-threads",
+            str(threads),
             "-c:v",
             "libx264",
             "-pix_fmt",
             "yuv420p",
             "-preset",
-            "veryfast",
+            "ultrafast",
             "-crf",
             "26",
+            # x264 applies these params after -threads, so the count has to
+            # be repeated here or threads=auto would undo the per-task split
+            # (0 means auto to x264, matching -threads semantics)
+            "-x264-params",
+            f"threads={threads}:sliced-threads=1:aq-mode=0",
             *command_footer,
         ],
         "h264_mp4_medium": [
             *command_header,
+            "-threads",
+            str(threads),
             "-c:v",
             "libx264",
             "-pix_fmt",
@@ -72,22 +252,188 @@ def get_ffmpeg_command(
             "22",
             *command_footer,
         ],
+        # Motion-vector visualization. One fused filtergraph at 960 width so
+        # the split/codecview/blend stages share a single downscaled working
+        # set instead of two full-resolution frame buffers per frame
+        "mv_visualize": [
+            FFMPEG_DIR,
+            "-hide_banner",
+            "-loglevel",
+            "warning",
+            "-flags2",
+            "+export_mvs",
+            # Decode only keyframes; the overlay is a diagnostic and does not
+            # need every frame, and export_mvs already disables the decoder
+            # fast paths
+            "-skip_frame",
+            "nokey",
+            "-i",
+            file_path,
+            "-filter_complex",
+            "[0:v]scale=960:-2,split=2[a][b];"
+            "[a]codecview=mv=pf+bf+bb[vex];"
+            "[vex][b]blend=all_mode=difference128,"
+            "eq=contrast=7:brightness=-1:gamma=1.5[out]",
+            "-filter_complex_threads",
+            "4",
+            "-map",
+            "[out]",
+            "-map",
+            "0:a?",
+            "-fps_mode",
+            "vfr",
+            "-threads",
+            str(threads),
+            "-c:v",
+            "libx264",
+            "-pix_fmt",
+            "yuv420p",
+            "-preset",
+            "ultrafast",
+            "-crf",
+            "26",
+            *command_footer,
+        ],
     }
 
+    # The default render is the plain light transcode; the motion-vector
+    # overlay only runs when asked for by name
+    ffmpeg_tasks["render"] = ffmpeg_tasks["h264_mp4_light"]
+
     command = []
     if task not in ffmpeg_tasks.keys():
         command = None
     else:
         command = ffmpeg_tasks[task]
+        hw_encoder = get_hw_encoder()
+        if hw_encoder is not None:
+            command = apply_hw_encoder(command, hw_encoder)
     task_types = ffmpeg_tasks.keys()
 
     return command, task_types
 
 
+def stream_render_video(
+    s3_bucket: str, s3_key: str, rendered_s3_key: str, task: str, threads: int = 0
+) -> bool:
+    success = True
+
+    ffmpeg_command, _ = get_ffmpeg_command(task, "pipe:0", "pipe:1", threads)
+    # The tasks already emit fragmented mp4; pipe:1 just needs the container
+    # spelled out since there is no file extension to infer it from
+    ffmpeg_command = ffmpeg_command[:-1] + ["-f", "mp4", ffmpeg_command[-1]]
+
+    logger.info("streaming render, key: %s -> %s", s3_key, rendered_s3_key)
+
+    proc = subprocess.Popen(
+        ffmpeg_command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=PIPE_BUFFER_SIZE,
+    )
+
+    errors = []
+    stderr_chunks = []
+
+    def feed_stdin():
+        try:
+            body = get_s3().get_object(Bucket=s3_bucket, Key=s3_key)["Body"]
+            shutil.copyfileobj(body, proc.stdin, PIPE_BUFFER_SIZE)
+        except BrokenPipeError:
+            # ffmpeg exited early; its stderr tells the real story
+            pass
+        except Exception as err:
+            # ffmpeg would wait forever on stdin; kill it so the other
+            # threads unblock and the error is reported instead of a hang
+            errors.append(err)
+            proc.kill()
+        finally:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    def drain_stdout():
+        try:
+            get_s3().upload_fileobj(
+                proc.stdout, s3_bucket, rendered_s3_key, Config=get_transfer_config()
+            )
+        except Exception as err:
+            # With nobody reading stdout ffmpeg blocks on a full pipe and the
+            # feeder blocks behind it; kill the process to unblock both
+            errors.append(err)
+            proc.kill()
+
+    def drain_stderr():
+        # Keep reading stderr while ffmpeg runs; if it fills the ~64 KiB pipe
+        # ffmpeg blocks mid-stream and the other joins never return
+        stderr_chunks.append(proc.stderr.read())
+
+    workers = [
+        threading.Thread(target=feed_stdin),
+        threading.Thread(target=drain_stderr),
+        threading.Thread(target=drain_stdout),
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    stderr = b"".join(stderr_chunks)
+    returncode = proc.wait()
+
+    if returncode != 0:
+        logger.error("ffmpeg failed, returncode: %d, stderr: %s", returncode, stderr)
+        success = False
+    for err in errors:
+        logger.error(err)
+        success = False
+
+    if not success:
+        # The upload thread finalizes whatever bytes reached stdout, so a
+        # failed render can leave a truncated object at the rendered key;
+        # remove it so downstream consumers never pick up garbage
+        try:
+            get_s3().delete_object(Bucket=s3_bucket, Key=rendered_s3_key)
+        except Exception as err:
+            logger.error(err)
+
+    return success
+
+
+def advise_sequential(file_path: str) -> None:
+    # Tell the kernel the file will be read once, front to back, so its
+    # pages are evicted promptly instead of the page cache holding the whole
+    # video alongside the copy on disk
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(
+                fd, 0, 0, os.POSIX_FADV_SEQUENTIAL | os.POSIX_FADV_NOREUSE
+            )
+        finally:
+            os.close(fd)
+    except OSError as err:
+        logger.debug(err)
+
+
 def download_video(s3_bucket: str, s3_key: str, file_path: str) -> bool:
     success = True
     try:
-        s3.download_file(Bucket=s3_bucket, Key=s3_key, Filename=file_path)
+        crt_manager = get_crt_manager()
+        if crt_manager is not None:
+            crt_manager.download(s3_bucket, s3_key, file_path).result()
+        else:
+            get_s3().download_file(
+                Bucket=s3_bucket,
+                Key=s3_key,
+                Filename=file_path,
+                Config=get_transfer_config(),
+            )
+        advise_sequential(file_path)
         logger.info("download complete")
         logger.info("file size of downloaded video: %s", os.path.getsize(file_path))
     except Exception as err:
@@ -96,7 +442,13 @@ def download_video(s3_bucket: str, s3_key: str, file_path: str) -> bool:
     return success
 
 
-def render_video(file_path: str, rendered_file_path: str) -> bool:
+def render_video(
+    file_path: str,
+    rendered_file_path: str,
+    task: str = "h264_mp4_light",
+    threads: int = 0,
+    timeout: Union[float, None] = None,
+) -> bool:
     success = True
 
     if not os.path.isfile(file_path):
@@ -105,13 +457,27 @@ def render_video(file_path: str, rendered_file_path: str) -> bool:
 
     logger.info("rendering video to path: %s", str(rendered_file_path))
 
-    ffmpeg_command = get_ffmpeg_command("h264_mp4_light", file_path, rendered_file_path)
-
-    res = subprocess.run(ffmpeg_command, capture_output=True)
+    ffmpeg_command, _ = get_ffmpeg_command(
+        task, file_path, rendered_file_path, threads
+    )
 
-    logger.info(f"response: {res}")
+    try:
+        res = subprocess.run(ffmpeg_command, capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logger.error("ffmpeg timed out after %s seconds", timeout)
+        return False
+
+    if res.returncode != 0:
+        logger.error(
+            "ffmpeg failed, returncode: %d, stderr: %s",
+            res.returncode,
+            res.stderr[-4096:],
+        )
+        return False
 
-    logger.info(f"rendered video size is {os.path.getsize(rendered_file_path)}")
+    # Only stat the output when the log line would be kept
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("rendered video size is %s", os.path.getsize(rendered_file_path))
 
     return success
 
@@ -128,7 +494,29 @@ def upload_video(s3_bucket: str, rendered_s3_key: str, rendered_file_path: str)
     )
 
     try:
-        s3.upload_file(rendered_file_path, s3_bucket, rendered_s3_key)
+        crt_manager = get_crt_manager()
+        if crt_manager is not None:
+            advise_sequential(rendered_file_path)
+            crt_manager.upload(rendered_file_path, s3_bucket, rendered_s3_key).result()
+        elif hasattr(os, "posix_fadvise"):
+            fd = os.open(rendered_file_path, os.O_RDONLY)
+            os.posix_fadvise(
+                fd, 0, 0, os.POSIX_FADV_SEQUENTIAL | os.POSIX_FADV_NOREUSE
+            )
+            with os.fdopen(fd, "rb", buffering=4 << 20) as rendered_file:
+                get_s3().upload_fileobj(
+                    rendered_file,
+                    s3_bucket,
+                    rendered_s3_key,
+                    Config=get_transfer_config(),
+                )
+        else:
+            get_s3().upload_file(
+                rendered_file_path,
+                s3_bucket,
+                rendered_s3_key,
+                Config=get_transfer_config(),
+            )
         logger.info("upload complete")
     except Exception as err:
         logger.error(err)
@@ -136,42 +524,37 @@ def upload_video(s3_bucket: str, rendered_s3_key: str, rendered_file_path: str)
     return success
 
 
-def check_available_space(s3_bucket: str, s3_key: str) -> None:
-    available_bytes, _ = get_available_space(TEMP_DIR)
-    object_bytes = get_obj_file_size(s3_bucket, s3_key)
-    if object_bytes < 0:
+def check_available_space(
+    s3_bucket: str, s3_key: str, object_bytes: Union[int, None] = None
+) -> None:
+    # Without a size hint the only way to know the object size up front is a
+    # head_object round trip; skip the check instead and let the download
+    # itself surface missing keys or a full disk
+    if object_bytes is None:
         logger.debug(
-            "key not found, bucket: %s, key: %s",
+            "no size hint for bucket: %s, key: %s, skipping space check",
             s3_bucket,
             s3_key,
         )
-        raise Exception("key not found in bucket")
-    elif object_bytes > available_bytes:
+        return
+    available_bytes, _ = get_available_space(TEMP_DIR)
+    if object_bytes > available_bytes:
         logger.debug("Out of space")
         raise Exception("Out of space")
 
 
-def get_obj_file_size(bucket: str, key: str) -> Union[int, None]:
-    object_size = None
-    try:
-        res = s3.head_object(Bucket=bucket, Key=key)
-        object_size = res.get("ContentLength")
-    except botocore.exceptions.ClientError as err:
-        logger.debug(err)
-    return object_size
-
-
 def clean_up_folder(folder_path: str) -> bool:
     success = True
-    for filename in os.listdir(folder_path):
-        file_path = os.path.join(folder_path, filename)
+    # scandir's DirEntry caches the stat result, so is_dir costs no extra
+    # syscall per entry the way os.path.isfile/isdir after listdir does
+    for entry in os.scandir(folder_path):
         try:
-            if os.path.isfile(file_path) or os.path.islink(file_path):
-                os.unlink(file_path)
-            elif os.path.isdir(file_path):
-                shutil.rmtree(file_path)
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
         except Exception as e:
-            print("Failed to delete %s. Reason: %s" % (file_path, e))
+            logger.error("Failed to delete %s. Reason: %s", entry.path, e)
             success = False
 
     return success
@@ -179,30 +562,35 @@ def clean_up_folder(folder_path: str) -> bool:
 
 def get_available_space(path: str) -> Tuple[int, int]:
     statvfs = os.statvfs(path)
-    user_bytes = statvfs.f_frsize * statvfs.f_bavail
-    free_bytes = statvfs.f_frsize * statvfs.f_bfree
+    user_bytes = _FRSIZE * statvfs.f_bavail
+    free_bytes = _FRSIZE * statvfs.f_bfree
     return (user_bytes, free_bytes)
 
 
+_VERSION_RE = re.compile(rb"^ffmpeg version (\S+)")
+
+
+@functools.lru_cache(maxsize=1)
 def get_ffmpeg_version() -> str:
-    ffmpeg_version = "unknown"
+    # The version is on the first line of the banner; read and decode just
+    # that instead of the whole -version output
     proc = subprocess.Popen(
         [FFMPEG_DIR, "-version"],
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
     )
-    out, _ = proc.communicate()
-    stdout = out.decode("utf-8")
-    if stdout.startswith("ffmpeg version"):
-        pos = stdout.find(" ", 15)
-        if pos > -1:
-            ffmpeg_version = stdout[15:pos]
-    return ffmpeg_version
+    first_line = proc.stdout.readline()
+    proc.stdout.close()
+    proc.wait()
+    match = _VERSION_RE.match(first_line)
+    return match.group(1).decode() if match else "unknown"
 
 
 def handler(event, context) -> dict:
     logger.debug("videocloud_ffmpeg called: %s", event)
-    logger.debug("running ffmpeg version: %s", get_ffmpeg_version())
+    # Only fork ffmpeg for the version string when the log line would be kept
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("running ffmpeg version: %s", get_ffmpeg_version())
 
     filename = unquote(event.get("filename", ""))
     tasks = event.get("tasks", None)
@@ -211,8 +599,7 @@ def handler(event, context) -> dict:
 
     s3_bucket = S3_SOURCE_BUCKET
     s3_key = S3_SOURCE_PATH + filename
-    rendered_filename = f"{str(Path(filename).stem)}_rendered.mp4"
-    rendered_s3_key = S3_RENDERED_PATH + rendered_filename
+    file_stem = str(Path(filename).stem)
 
     assert s3_key != S3_SOURCE_PATH, "filename is required"
     assert filename, "filename is required"
@@ -221,31 +608,83 @@ def handler(event, context) -> dict:
     for task in tasks:
         assert task in task_types, f"task must be one of: {task_types}"
 
-    logger.info("bucket: %s, key: %s, task: %s", s3_bucket, s3_key, task)
+    logger.info("bucket: %s, key: %s, tasks: %s", s3_bucket, s3_key, tasks)
+
+    # Tasks are independent, so run one ffmpeg process per task and split the
+    # vCPUs between them instead of rendering back to back
+    threads_per_task = max(1, (os.cpu_count() or 2) // len(tasks))
+
+    def rendered_key(task: str) -> str:
+        return S3_RENDERED_PATH + f"{file_stem}_{task}.mp4"
+
+    # .mov sources keep their moov atom at the end of the file and cannot be
+    # demuxed from an unseekable pipe, so a streaming attempt would download
+    # the whole object just to fail; send them straight to the disk pipeline
+    streamable = STREAMING_ENABLED and Path(filename).suffix.lower() != ".mov"
+
+    if streamable:
+        # Pipe download -> render -> upload so nothing touches /tmp and the
+        # three stages overlap instead of running back to back
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+            futures = {
+                task: pool.submit(
+                    stream_render_video,
+                    s3_bucket,
+                    s3_key,
+                    rendered_key(task),
+                    task,
+                    threads_per_task,
+                )
+                for task in tasks
+            }
+            failed = [task for task, fut in futures.items() if not fut.result()]
+        if not failed:
+            logger.info("rendering complete")
+            return {"data": "success"}
+
+        # Sources with a trailing moov atom (typical camera output) cannot
+        # be demuxed from an unseekable pipe; retry the failed tasks through
+        # the disk pipeline, which can seek
+        logger.warning(
+            "streaming render failed for tasks: %s, falling back to disk pipeline",
+            failed,
+        )
+        tasks = failed
 
     # Set video path in temporary directory
     local_video_path = f"{TEMP_DIR}/{filename}"
-    rendered_file_path = f"{TEMP_DIR}/{rendered_filename}"
 
-    # Clean tmp folder before starting
-    subprocess.call(f"rm -rf /tmp/*", shell=True)
+    # Clean tmp folder before starting, without forking a shell for it
+    if not clean_up_folder(folder_path=TEMP_DIR):
+        logger.info("failed to clean folder: %s", TEMP_DIR)
 
-    check_available_space(s3_bucket, s3_key)
+    check_available_space(s3_bucket, s3_key, event.get("size"))
 
     # Downloads video from s3 into temporary directory
     logger.info("downloading video from key: %s", s3_key)
     if not download_video(s3_bucket, s3_key, local_video_path):
         raise Exception("download failed, file may not exist")
 
-    # Renders the video into temporary temp/rendered/ directory
+    def render_and_upload(task: str) -> bool:
+        rendered_file_path = f"{TEMP_DIR}/{file_stem}_{task}.mp4"
+        # Kill a hung ffmpeg before the lambda timeout burns the full
+        # billed duration, leaving a margin for the upload
+        timeout = None
+        if hasattr(context, "get_remaining_time_in_millis"):
+            timeout = max(5.0, context.get_remaining_time_in_millis() / 1000 - 5)
+        if not render_video(
+            local_video_path, rendered_file_path, task, threads_per_task, timeout
+        ):
+            return False
+        return upload_video(s3_bucket, rendered_key(task), rendered_file_path)
+
+    # Renders and uploads each task concurrently off the shared download
     logger.info("rendering video")
-    if not render_video(local_video_path, rendered_file_path):
-        raise Exception("rendering failed")
-
-    # Uploads rendered video to /rendered/ directory in s3
-    logger.info("uploading rendered video to key: %s", rendered_s3_key)
-    if not upload_video(s3_bucket, rendered_s3_key, rendered_file_path):
-        raise Exception("upload failed")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = {task: pool.submit(render_and_upload, task) for task in tasks}
+        failed = [task for task, fut in futures.items() if not fut.result()]
+    if failed:
+        raise Exception(f"render failed for tasks: {failed}")
 
     # No longer need source files or rendered files
     if not clean_up_folder(folder_path=TEMP_DIR):